@@ -11,6 +11,7 @@ Usage:
     python3 neewer_usb_control.py on
     python3 neewer_usb_control.py off
     python3 neewer_usb_control.py status
+    python3 neewer_usb_control.py daemon
 
 Examples:
     python3 neewer_usb_control.py 100           # 100% brightness, default 4950K
@@ -19,11 +20,18 @@ Examples:
     python3 neewer_usb_control.py 50 4000       # 50%, warm white
     python3 neewer_usb_control.py off           # brightness 0
     python3 neewer_usb_control.py status        # read current state
+    python3 neewer_usb_control.py daemon        # hold the port open for later calls
 """
 
+import bisect
+import contextlib
+import fcntl
 import serial
-import glob
+import os
+import socket
+import struct
 import sys
+import termios
 import time
 
 # Temperature mapping: 19 steps (0x00–0x12) across 2900K–7000K.
@@ -33,53 +41,144 @@ TEMP_MAX_K = 7000
 TEMP_STEPS = 18  # 0x00 = 2900K, 0x12 = 7000K
 DEFAULT_TEMP_K = 4950  # midpoint
 
+# macOS serial ioctl (IOKit/serial/ioss.h): receive data latency in µs.
+# The CH340/FTDI drivers otherwise batch incoming bytes for up to ~16 ms.
+IOSSDATALAT = 0x80085400
 
-def kelvin_to_byte(kelvin: int) -> int:
-    kelvin = max(TEMP_MIN_K, min(TEMP_MAX_K, kelvin))
+# Unix socket used by `daemon` mode to keep the serial port open between calls.
+# Per-user: macOS sets a private $TMPDIR; elsewhere the uid keeps it distinct.
+SOCKET_PATH = os.path.join(os.environ.get("TMPDIR") or "/tmp",
+                           f"neewer-{os.getuid()}.sock")
+# Seconds the daemon waits for a client's command; a little above the 0.5 s
+# echo wait. Clients wait twice as long so one stalled connection ahead of
+# them doesn't push them onto the direct-open fallback.
+SOCKET_TIMEOUT = 1.0
+
+
+def _kelvin_step(kelvin: int) -> int:
     return round((kelvin - TEMP_MIN_K) * TEMP_STEPS / (TEMP_MAX_K - TEMP_MIN_K))
 
 
+# Lookup tables built once from the linear mapping above.
+# _K_BOUNDARIES[i] is the lowest Kelvin value that maps to byte i + 1.
+_K_BOUNDARIES = tuple(k for k in range(TEMP_MIN_K + 1, TEMP_MAX_K + 1)
+                      if _kelvin_step(k) != _kelvin_step(k - 1))
+_B_TO_K = tuple(round(TEMP_MIN_K + b * (TEMP_MAX_K - TEMP_MIN_K) / TEMP_STEPS)
+                for b in range(TEMP_STEPS + 1))
+
+
+def kelvin_to_byte(kelvin: int) -> int:
+    return bisect.bisect_right(_K_BOUNDARIES, kelvin)
+
+
 def byte_to_kelvin(b: int) -> int:
-    b = max(0, min(TEMP_STEPS, b))
-    return round(TEMP_MIN_K + b * (TEMP_MAX_K - TEMP_MIN_K) / TEMP_STEPS)
+    return _B_TO_K[max(0, min(TEMP_STEPS, b))]
 
 
 def find_serial_port():
-    ports = glob.glob("/dev/cu.usbserial-*")
-    if not ports:
-        print("Error: No USB serial port found. Is the light connected?")
-        sys.exit(1)
-    return ports[0]
+    with os.scandir("/dev") as entries:
+        for entry in entries:
+            if entry.name.startswith("cu.usbserial-"):
+                return entry.path
+    print("Error: No USB serial port found. Is the light connected?")
+    sys.exit(1)
+
+
+def set_low_latency(ser):
+    """Ask the macOS serial driver to hand over received bytes within 1 ms."""
+    if sys.platform != "darwin":
+        return
+    try:
+        fcntl.ioctl(ser.fileno(), IOSSDATALAT, struct.pack("L", 1000))
+    except OSError:
+        pass  # not every driver honours it
 
 
 def usb_checksum(data: bytes) -> bytes:
     """16-bit big-endian checksum (decoded from app binary)."""
-    s = sum(data) & 0xFFFF
-    return bytes([s >> 8, s & 0xFF])
+    return (sum(data) & 0xFFFF).to_bytes(2, "big")
+
+
+# Reusable CCT frame: 3A 02 03 01 [brightness] [temp_byte] [cs_hi] [cs_lo]
+_CCT_FRAME = bytearray(b"\x3a\x02\x03\x01\x00\x00\x00\x00")
+
 
+def cct_frame(brightness: int, temp_byte: int) -> bytearray:
+    """Patch brightness/temp and checksum into the shared CCT frame."""
+    _CCT_FRAME[4] = brightness
+    _CCT_FRAME[5] = temp_byte
+    s = 0x40 + brightness + temp_byte  # fixed header bytes sum to 0x40
+    _CCT_FRAME[6] = s >> 8
+    _CCT_FRAME[7] = s & 0xFF
+    return _CCT_FRAME
 
-def send_command(ser, payload: bytes, wait=0.5) -> bytes:
+
+def send_command(ser, payload: bytes, wait=0.5, flush_input=False) -> bytes:
     """Send command and return response (if any)."""
-    cmd = payload + usb_checksum(payload)
-    ser.reset_input_buffer()
-    ser.write(cmd)
-    ser.flush()
-    time.sleep(wait)
-    n = ser.in_waiting
-    if n > 0:
-        return ser.read(n)
-    return b""
+    return send_frame(ser, payload + usb_checksum(payload), wait, flush_input)
+
+
+def send_frame(ser, cmd, wait=0.5, flush_input=False) -> bytes:
+    """Send a complete frame (checksum included) and return response.
 
+    Pending input is left in the buffer unless flush_input is set, and a
+    queued status packet would then be read back as the echo. Pass
+    flush_input=True whenever input may have built up since the port was
+    last drained (e.g. knob turns between daemon commands).
+    """
+    if flush_input:
+        ser.reset_input_buffer()
+    # Write straight to the fd to skip pyserial's write wrapper. pyserial
+    # opens the port O_NONBLOCK, so on a short write or EAGAIN hand the
+    # remainder to ser.write, which waits for the port to accept it.
+    fd = ser.fileno()
+    try:
+        written = os.write(fd, cmd)
+    except BlockingIOError:
+        written = 0
+    if written < len(cmd):
+        ser.write(cmd[written:])
+    termios.tcdrain(fd)
+    # The light echoes the frame back, so block until exactly that many
+    # bytes arrive (or wait elapses) rather than sampling in_waiting. Any
+    # further pending bytes are left for the next reader or flush.
+    prev_timeout = ser.timeout
+    ser.timeout = wait
+    try:
+        return ser.read(len(cmd))
+    finally:
+        ser.timeout = prev_timeout
 
-def set_cct(ser, brightness: int, kelvin: int = DEFAULT_TEMP_K):
+
+def set_cct(ser, brightness: int, kelvin: int = DEFAULT_TEMP_K, flush_input=False):
     """Set CCT mode: brightness 0-100, temperature in Kelvin."""
     brightness = max(0, min(100, brightness))
     temp_byte = kelvin_to_byte(kelvin)
     actual_kelvin = byte_to_kelvin(temp_byte)
-    payload = bytes([0x3A, 0x02, 0x03, 0x01, brightness, temp_byte])
-    resp = send_command(ser, payload)
-    status = "OK" if resp else "Sent (no echo)"
-    print(f"{status}: brightness={brightness}% temp={actual_kelvin}K (0x{temp_byte:02x})")
+    frame = cct_frame(brightness, temp_byte)
+    resp = send_frame(ser, frame, flush_input=flush_input)
+    if resp == frame:
+        status = "OK"
+    elif resp:
+        status = "Sent (unexpected reply)"
+    else:
+        status = "Sent (no echo)"
+    line = f"{status}: brightness={brightness}% temp={actual_kelvin}K (0x{temp_byte:02x})"
+    print(line)
+    return line
+
+
+def parse_cct_args(args):
+    """Map CLI args (on/off/<brightness> [temperature_K]) to (brightness, kelvin)."""
+    cmd = args[0].lower()
+    if cmd == "on":
+        return 100, DEFAULT_TEMP_K
+    if cmd == "off":
+        return 0, DEFAULT_TEMP_K
+    if cmd.isdigit() or (cmd.startswith('-') and cmd[1:].isdigit()):
+        kelvin = int(args[1]) if len(args) > 1 else DEFAULT_TEMP_K
+        return int(cmd), kelvin
+    return None
 
 
 def read_status(ser, timeout=3.0):
@@ -87,17 +186,108 @@ def read_status(ser, timeout=3.0):
     print(f"Listening for status packets ({timeout}s)...")
     print("(Turn the knob on the light to trigger a status update)")
     ser.reset_input_buffer()
-    end = time.time() + timeout
-    while time.time() < end:
-        n = ser.in_waiting
-        if n >= 8:
-            data = ser.read(8)
-            if data[0] == 0x3A and data[1] == 0x02:
-                bri = data[4]
-                temp_byte = data[5]
-                kelvin = byte_to_kelvin(temp_byte)
-                print(f"  brightness={bri}% temp={kelvin}K (0x{temp_byte:02x})")
-        time.sleep(0.1)
+    chunk = bytearray(8)
+    view = memoryview(chunk)
+    buf = bytearray()
+    readinto = ser.readinto
+    now = time.time
+    end = now() + timeout
+    prev_timeout = ser.timeout
+    try:
+        while True:
+            # Block in pyserial until a full packet arrives or the window closes
+            remaining = end - now()
+            if remaining <= 0:
+                break
+            ser.timeout = remaining
+            buf += view[:readinto(chunk)]
+            # Resync on the 0x3A prefix and only accept packets whose checksum
+            # matches, so a partial read can't misalign every later packet
+            while len(buf) >= 8:
+                start = buf.find(0x3A)
+                if start < 0:
+                    buf.clear()
+                    break
+                del buf[:start]
+                if len(buf) < 8:
+                    break
+                if buf[1] == 0x02 and usb_checksum(buf[:6]) == buf[6:8]:
+                    bri = buf[4]
+                    temp_byte = buf[5]
+                    kelvin = byte_to_kelvin(temp_byte)
+                    print(f"  brightness={bri}% temp={kelvin}K (0x{temp_byte:02x})")
+                    del buf[:8]
+                else:
+                    del buf[:1]
+    finally:
+        ser.timeout = prev_timeout
+
+
+def _daemon_running():
+    """True if something is already accepting connections on SOCKET_PATH."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            probe.settimeout(SOCKET_TIMEOUT)
+            probe.connect(SOCKET_PATH)
+        return True
+    except OSError:
+        return False
+
+
+def run_daemon(ser):
+    """Keep the port open and apply CCT commands received on SOCKET_PATH."""
+    if _daemon_running():
+        print(f"Error: a daemon is already listening on {SOCKET_PATH}")
+        sys.exit(1)
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(SOCKET_PATH)  # stale socket left by a crashed daemon
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(SOCKET_PATH)
+    os.chmod(SOCKET_PATH, 0o600)
+    bound_inode = os.stat(SOCKET_PATH).st_ino
+    server.listen()
+    print(f"Listening on {SOCKET_PATH} (Ctrl-C to stop)")
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                # A silent or vanished client must not stall later commands
+                conn.settimeout(SOCKET_TIMEOUT)
+                try:
+                    args = conn.recv(64).decode(errors="replace").split()
+                    try:
+                        cct = parse_cct_args(args) if args else None
+                    except ValueError:
+                        cct = None
+                    if cct is None:
+                        reply = f"Unknown command: {' '.join(args)}"
+                    else:
+                        # Knob-turn status packets queue up between commands;
+                        # drop them so they aren't read back as the echo
+                        reply = set_cct(ser, *cct, flush_input=True)
+                    conn.sendall(reply.encode() + b"\n")
+                except OSError:
+                    continue
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        # Only remove the socket if it is still the one this daemon bound
+        with contextlib.suppress(FileNotFoundError):
+            if os.stat(SOCKET_PATH).st_ino == bound_inode:
+                os.unlink(SOCKET_PATH)
+
+
+def send_to_daemon(args):
+    """Forward a command to a running daemon. Returns its reply, or None."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(2 * SOCKET_TIMEOUT)
+            conn.connect(SOCKET_PATH)
+            conn.sendall(" ".join(args).encode() + b"\n")
+            return conn.recv(256).decode().strip()
+    except OSError:
+        return None  # stale socket, hung or missing daemon — open directly
 
 
 def main():
@@ -107,29 +297,41 @@ def main():
         print("  neewer_usb_control.py on")
         print("  neewer_usb_control.py off")
         print("  neewer_usb_control.py status")
+        print("  neewer_usb_control.py daemon")
         print()
         print(f"  Temperature: {TEMP_MIN_K}K–{TEMP_MAX_K}K (default {DEFAULT_TEMP_K}K)")
         sys.exit(1)
 
     cmd = sys.argv[1].lower()
+    cct = parse_cct_args(sys.argv[1:])
+    if cct is not None and os.path.exists(SOCKET_PATH):
+        reply = send_to_daemon(sys.argv[1:])
+        if reply is not None:
+            print(reply)
+            return
+
+    # Opening the port flushes it (and may reset the light), so never touch
+    # it while a daemon owns it: a second daemon or a status reader would
+    # disturb the live one and steal its packets
+    if cmd in ("daemon", "status") and _daemon_running():
+        print(f"Error: a daemon is already using the light ({SOCKET_PATH})")
+        if cmd == "status":
+            print("Stop the daemon to read status packets directly.")
+        sys.exit(1)
+
     port = find_serial_port()
     ser = serial.Serial(port, 115200, timeout=1)
-    time.sleep(0.2)
-    ser.read(ser.in_waiting or 0)  # drain
-
-    if cmd == "on":
-        set_cct(ser, 100)
+    termios.tcflush(ser.fileno(), termios.TCIOFLUSH)  # drop stale I/O
+    set_low_latency(ser)
 
-    elif cmd == "off":
-        set_cct(ser, 0)
+    if cct is not None:
+        set_cct(ser, *cct)
 
     elif cmd == "status":
         read_status(ser)
 
-    elif cmd.isdigit() or (cmd.startswith('-') and cmd[1:].isdigit()):
-        bri = int(cmd)
-        kelvin = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_TEMP_K
-        set_cct(ser, bri, kelvin)
+    elif cmd == "daemon":
+        run_daemon(ser)
 
     else:
         print(f"Unknown command: {cmd}")
@@ -12,41 +12,38 @@ Usage:
 """
 
 import serial
-import glob
-import sys
-import time
+import os
+import termios
 import json
 
+from neewer_usb_control import find_serial_port, usb_checksum
 
-def find_serial_port():
-    ports = glob.glob("/dev/cu.usbserial-*")
-    if not ports:
-        print("Error: No USB serial port found. Is the light connected?")
-        sys.exit(1)
-    return ports[0]
+
+def build_frame(temp_byte, brightness=100):
+    payload = bytes([0x3A, 0x02, 0x03, 0x01, brightness, temp_byte])
+    return payload + usb_checksum(payload)
 
 
-def usb_checksum(data: bytes) -> bytes:
-    s = sum(data) & 0xFFFF
-    return bytes([s >> 8, s & 0xFF])
+# The sweep always runs at full brightness, so build all 64 frames up front.
+FRAMES = tuple(build_frame(t) for t in range(0x40))
 
 
 def set_temp(ser, temp_byte, brightness=100):
     brightness = max(0, min(100, brightness))
-    payload = bytes([0x3A, 0x02, 0x03, 0x01, brightness, temp_byte])
-    cmd = payload + usb_checksum(payload)
+    if brightness == 100 and temp_byte < len(FRAMES):
+        cmd = FRAMES[temp_byte]
+    else:
+        cmd = build_frame(temp_byte, brightness)
+    # The previous command's echo arrives while the user is typing; drop it
+    # here instead of blocking on it after every write
     ser.reset_input_buffer()
     ser.write(cmd)
-    ser.flush()
-    time.sleep(0.3)
-    ser.read(ser.in_waiting or 0)  # drain echo
 
 
 def main():
     port = find_serial_port()
     ser = serial.Serial(port, 115200, timeout=1)
-    time.sleep(0.2)
-    ser.read(ser.in_waiting or 0)
+    termios.tcflush(ser.fileno(), termios.TCIFLUSH)  # drop stale input
 
     print("=" * 60)
     print("  Neewer PL81-Pro — Temperature Calibration")
@@ -117,13 +114,17 @@ def main():
         # Save to file
         out = {f"0x{t:02x}": {"decimal": t, "description": results[t]}
                for t in sorted(results.keys())}
-        with open("temp_calibration.json", "w") as f:
+        # Write to a temp file and rename so an interrupted save can't
+        # truncate an earlier calibration
+        with open("temp_calibration.json.tmp", "w") as f:
             json.dump(out, f, indent=2)
+        os.replace("temp_calibration.json.tmp", "temp_calibration.json")
         print()
         print(f"  Saved to temp_calibration.json")
     else:
         print("  No data recorded.")
 
+    ser.flush()
     ser.close()
     print("\nDone.")
 